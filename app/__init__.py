@@ -2,19 +2,27 @@ import os
 from flask import Flask
 from flask_bootstrap import Bootstrap
 from flask_session import Session
+from cachelib import FileSystemCache
 from config import Config
-from .extensions import db, login_manager, migrate
+from .extensions import db, login_manager, migrate, ORJSONProvider, set_sqlite_pragma
+from sqlalchemy import event
 import logging
 from logging.handlers import RotatingFileHandler
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.json = ORJSONProvider(app)
     
     # Initialize extensions
     Bootstrap(app)
     Session(app)
+    app.extensions['results_cache'] = FileSystemCache(
+        app.config['RESULTS_CACHE_DIR'], default_timeout=app.config['RESULTS_CACHE_TIMEOUT']
+    )
     db.init_app(app)
+    with app.app_context():
+        event.listen(db.engine, 'connect', set_sqlite_pragma)
     login_manager.init_app(app)
     migrate.init_app(app, db)
 
@@ -37,10 +45,10 @@ def create_app(config_class=Config):
         file_handler.setFormatter(logging.Formatter(
             '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
         ))
-        file_handler.setLevel(logging.INFO)
+        file_handler.setLevel(app.config['LOG_LEVEL'])
         app.logger.addHandler(file_handler)
 
-        app.logger.setLevel(logging.INFO)
+        app.logger.setLevel(app.config['LOG_LEVEL'])
         app.logger.info('BED Generator startup')
 
     @app.context_processor
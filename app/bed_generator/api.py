@@ -10,6 +10,7 @@ Functions:
 - process_coordinate_data: Processes coordinate data to extract relevant gene overlap information.
 - fetch_genes_for_panel: Fetches genes associated with a specific panel from PanelApp, filtered by confidence level.
 - validate_coordinates: Validates the format of genomic coordinates from frontend.
+- validate_coordinates_batch: Validates a list of genomic coordinates, returning the first error found.
 - select_transcripts: Selects the most relevant transcripts based on assembly and version.
 - process_transcripts: Processes transcript data and returns formatted results.
 - process_grch38_mane_select: Helper function to process GRCh38 MANE SELECT transcripts.
@@ -33,6 +34,9 @@ ENSEMBL_GRCh37_URL = "https://grch37.rest.ensembl.org"
 TARK_API_URL = "https://tark.ensembl.org/api/"
 PANELAPP_API_URL = "https://panelapp.genomicsengland.co.uk/api/v1/"
 
+# Genomic coordinate format accepted from the frontend: 'chromosome:start-end', optional 'chr' prefix
+VALID_COORD_RE = re.compile(r'^(chr)?([1-9][0-9]?|[XYM]):(\d+)-(\d+)$', re.IGNORECASE)
+
 # Helper functions
 def get_ensembl_url(assembly: str) -> str:
     """Returns the appropriate Ensembl API URL based on the given assembly version."""
@@ -153,7 +157,7 @@ def fetch_data_from_tark(identifier: str, assembly: str) -> Optional[List[Dict]]
     """
     Fetches transcript data from TARK API with optimized request handling and parallel processing.
     """
-    print(f"\n=== Fetching data for identifier: {identifier} ===")
+    logger.debug("Fetching data for identifier: %s", identifier)
     base_accession = identifier.split('.')[0]
     version = identifier.split('.')[1] if '.' in identifier else None
     
@@ -166,25 +170,25 @@ def fetch_data_from_tark(identifier: str, assembly: str) -> Optional[List[Dict]]
     
     # Make a single API call to get all transcript data
     data = ApiClient.get_tark_data(search_url, params)
-    print(f"Initial TARK search result: {bool(data)}")
+    logger.debug("Initial TARK search result: %s", bool(data))
     
     # If we're looking for GRCh37 and either no data found or no GRCh37 transcripts
     if assembly == 'GRCh37' and (not data or not any(t for t in data if t['assembly'] == 'GRCh37')):
         # Try Ensembl gene symbol lookup as fallback
         ensembl_url = f"https://rest.ensembl.org/xrefs/symbol/homo_sapiens/{identifier}?content-type=application/json"
-        print(f"Trying Ensembl lookup URL: {ensembl_url}")
+        logger.debug("Trying Ensembl lookup URL: %s", ensembl_url)
         ensembl_data = ApiClient.get_ensembl_data(ensembl_url)
-        print(f"Ensembl lookup response: {ensembl_data}")
+        logger.debug("Ensembl lookup response: %r", ensembl_data)
         
         if ensembl_data and len(ensembl_data) > 0:
             ensembl_id = ensembl_data[0].get('id')
-            print(f"Found Ensembl ID: {ensembl_id}")
+            logger.debug("Found Ensembl ID: %s", ensembl_id)
             if ensembl_id:
                 # Try TARK search with Ensembl ID
                 params['identifier_field'] = ensembl_id
-                print(f"Trying TARK search with Ensembl ID. URL: {search_url}, Params: {params}")
+                logger.debug("Trying TARK search with Ensembl ID. URL: %s, Params: %r", search_url, params)
                 new_data = ApiClient.get_tark_data(search_url, params)
-                print(f"TARK search with Ensembl ID result: {bool(new_data)}")
+                logger.debug("TARK search with Ensembl ID result: %s", bool(new_data))
                 if new_data:
                     logger.info(f"Found transcript data using Ensembl ID lookup for {identifier}")
                     # Add warning about using Ensembl ID lookup
@@ -197,7 +201,7 @@ def fetch_data_from_tark(identifier: str, assembly: str) -> Optional[List[Dict]]
                     data = new_data
 
     if not data or (assembly == 'GRCh37' and not any(t for t in data if t['assembly'] == 'GRCh37')):
-        print("No data found after all attempts")
+        logger.debug("No data found for %s after all attempts", identifier)
         return None
         
     # Filter and process transcripts based on assembly and version
@@ -341,8 +345,7 @@ def process_transcripts(transcripts: List[Dict], identifier: str) -> List[Dict]:
         if not transcript:
             continue
 
-        print(f"\nProcessing transcript: {transcript.get('stable_id')}")
-        print(f"Assembly: {transcript.get('assembly')}")
+        logger.debug("Processing transcript %s (%s)", transcript.get('stable_id'), transcript.get('assembly'))
         
         # Get Ensembl ID and Entrez ID from genes data
         ensembl_id = None
@@ -366,10 +369,8 @@ def process_transcripts(transcripts: List[Dict], identifier: str) -> List[Dict]:
             mane_transcript = transcript.get('mane_transcript', '')
             mane_transcript_type = transcript.get('mane_transcript_type', '')
         
-        print(f"Found Ensembl ID from genes: {ensembl_id}")
-        print(f"Found Entrez ID from genes: {entrez_id}")
-        print(f"MANE transcript (only for GRCh38): {mane_transcript}")
-        print(f"MANE transcript type (only for GRCh38): {mane_transcript_type}")
+        logger.debug("Genes data: Ensembl ID %s, Entrez ID %s, MANE transcript %s (%s)",
+                     ensembl_id, entrez_id, mane_transcript, mane_transcript_type)
 
         # Build the result dictionary
         for index, exon in enumerate(transcript.get('exons', []), start=1):
@@ -411,7 +412,8 @@ def process_transcripts(transcripts: List[Dict], identifier: str) -> List[Dict]:
             
             results.append(result)
 
-        print(f"Final result for transcript: {results[-1]}")
+        if results:
+            logger.debug("Final result for transcript: %r", results[-1])
 
     return results
 
@@ -570,7 +572,7 @@ def fetch_genes_for_panel(panel_id: int, include_amber: bool, include_red: bool)
         data = response.json()
         
         if not data.get('genes'):
-            print(f"No genes found in panel data: {data}")
+            logger.warning("No genes found in panel data for panel %s", panel_id)
             return []
         
         genes = []
@@ -587,14 +589,14 @@ def fetch_genes_for_panel(panel_id: int, include_amber: bool, include_red: bool)
                     'confidence': confidence
                 })
         
-        print(f"Found {len(genes)} genes for panel {panel_id}")
+        logger.debug("Found %d genes for panel %s", len(genes), panel_id)
         return genes
         
     except requests.RequestException as e:
-        print(f"Error fetching genes from PanelApp: {str(e)}")
+        logger.error(f"Error fetching genes from PanelApp: {str(e)}")
         return []
     except Exception as e:
-        print(f"Unexpected error fetching genes: {str(e)}")
+        logger.error(f"Unexpected error fetching genes: {str(e)}")
         return []
 
 def validate_coordinates(coordinates: str) -> Optional[str]:
@@ -607,9 +609,8 @@ def validate_coordinates(coordinates: str) -> Optional[str]:
     Returns:
         Optional[str]: An error message if the format is invalid, otherwise None.
     """
-    # Validates the coordinate format using a regular expression.
-    regex = r'^(chr)?([1-9][0-9]?|[XYM]):(\d+)-(\d+)$'
-    match = re.match(regex, coordinates, re.IGNORECASE)
+    # Validates the coordinate format using the precompiled regular expression.
+    match = VALID_COORD_RE.match(coordinates)
 
     if not match:
         return "Invalid format. Use 'chromosome:start-end' (e.g., 1:200-300 or chr1:200-300)."
@@ -620,4 +621,24 @@ def validate_coordinates(coordinates: str) -> Optional[str]:
     if start > end:
         return "End position cannot be less than start position."
 
+    return None
+
+def validate_coordinates_batch(coordinates: List[str]) -> Optional[str]:
+    """
+    Validates a list of genomic coordinates, stopping at the first invalid one.
+
+    Args:
+        coordinates (List[str]): Genomic coordinates in the format 'chromosome:start-end'.
+
+    Returns:
+        Optional[str]: The error message for the first invalid coordinate, otherwise None.
+    """
+    match_coord = VALID_COORD_RE.match
+    for coord in coordinates:
+        match = match_coord(coord)
+        if not match:
+            return "Invalid format. Use 'chromosome:start-end' (e.g., 1:200-300 or chr1:200-300)."
+        if int(match.group(3)) > int(match.group(4)):
+            return "End position cannot be less than start position."
+
     return None
\ No newline at end of file
@@ -6,164 +6,254 @@ Classes:
     Methods:
     - format_bed_line: Formats a single BED line based on the specified format type.
     - create_bed: Creates BED file content from a list of results in a specified format.
-    - create_formatted_bed: Creates formatted BED file content in any supported format.
+    - iter_bed_lines: Yields formatted BED lines one at a time, skipping rows that cannot be formatted.
+    - iter_bed_chunks: Yields formatted BED content as UTF-8 byte chunks for streaming.
+    - create_formatted_bed_bytes: Creates formatted BED file content as bytes using a reusable buffer.
 
 Functions:
+- write_bed_file: Writes encoded BED content to disk through a raw file descriptor.
 - generate_bed_files: Generates different BED file formats and stores them in database and filesystem.
 """
 
-from typing import List, Dict, Union
+from typing import List, Dict, Union, Iterator, Callable, Optional
+from functools import lru_cache
 from flask import current_app
 import os
+import logging
+import threading
 from app.models import BedFile
 from app.extensions import db
 
+# Per-thread output buffer reused by create_formatted_bed_bytes between calls
+_BUF = threading.local()
+BUF_INITIAL_SIZE = 1 << 16
+# Buffers that grew beyond this after a large panel are dropped rather than kept alive
+BUF_RETAIN_LIMIT = 1 << 17
+
+@lru_cache(maxsize=256)
+def _with_chr_prefix(region: str) -> str:
+    """Adds the 'chr' prefix to a region unless it already has one; a panel only spans a few distinct regions."""
+    return region if region.lower().startswith('chr') else f'chr{region}'
+
+def _basic_row_fmt(r: Dict, region: str, start: int, end: int, raw: tuple) -> str:
+    return f"{region}\t{start}\t{end}"
+
+class BedFormatError(Exception):
+    """Raised when a result cannot be formatted as a BED line; carries the offending result."""
+    def __init__(self, message: str, result: Dict):
+        super().__init__(message)
+        self.result = result
+
 class BedGenerator:
-    # Define format configurations as a class attribute
+    # Define format configurations as a class attribute.
+    # Each 'row_fmt' builds the whole line in one f-string from the result, the output
+    # region/start/end and the unpadded (region, start, end) tuple.
     BED_FORMATS = {
         'data': {
-            'fields': [
-                lambda r, _: str(r['entrez_id']),
-                lambda r, _: f"{r['gene']};{r['accession']}"
-            ]
+            'row_fmt': lambda r, region, start, end, raw:
+                f"{region}\t{start}\t{end}\t{r['entrez_id']}\t{r['gene']};{r['accession']}"
         },
         'sambamba': {
-            'fields': [
-                lambda r, p: f"{r['loc_region']}-{r['loc_start']}-{r['loc_end']}", 
-                lambda r, _: "0",
-                lambda r, _: '+' if r.get('loc_strand', 1) > 0 else '-',
-                lambda r, _: f"{r['gene']};{r['accession']}",
-                lambda r, _: str(r['entrez_id'])
-            ]
+            'row_fmt': lambda r, region, start, end, raw:
+                f"{region}\t{start}\t{end}\t{'%s-%d-%d' % raw}\t0\t"
+                f"{'+' if r.get('loc_strand', 1) > 0 else '-'}\t{r['gene']};{r['accession']}\t{r['entrez_id']}"
         },
         'exomeDepth': {
-            'fields': [
-                lambda r, _: f"{r['gene']}_{r.get('exon_number', '')}"
-            ]
+            'row_fmt': lambda r, region, start, end, raw:
+                f"{region}\t{start}\t{end}\t{r['gene']}_{r.get('exon_number', '')}"
         },
         'cnv': {
-            'fields': [
-                lambda r, _: f"{r['gene']};{r['accession']}"
-            ]
+            'row_fmt': lambda r, region, start, end, raw:
+                f"{region}\t{start}\t{end}\t{r['gene']};{r['accession']}"
         }
     }
 
     @classmethod
     def format_bed_line(cls, result: Dict, padding: int, format_type: str, add_chr_prefix: bool = False) -> str:
         """Formats a single BED line."""
+        try:
+            return cls._format_row(result, padding, cls._row_formatter(format_type), add_chr_prefix)
+        except BedFormatError as e:
+            cls._log_format_error(e)
+            raise
+
+    @classmethod
+    def _row_formatter(cls, format_type: str) -> Callable[..., str]:
+        """Resolves the row formatter for a format type; unknown types get the basic BED fields."""
+        format_config = cls.BED_FORMATS.get(format_type)
+        return format_config['row_fmt'] if format_config else _basic_row_fmt
+
+    @classmethod
+    def _format_row(cls, result: Dict, padding: int, row_fmt: Callable[..., str], add_chr_prefix: bool = False) -> str:
+        """
+        Formats a single BED line with an already-resolved row formatter.
+
+        Kept free of Flask and logging so it stays a plain function over its arguments;
+        failures are raised as BedFormatError and logged by the caller.
+        """
         try:
             # Format chromosome/region
-            loc_region = str(result['loc_region'])
-            if add_chr_prefix and not loc_region.lower().startswith('chr'):
-                loc_region = f'chr{loc_region}'
+            raw_region = loc_region = str(result['loc_region'])
+            if add_chr_prefix:
+                loc_region = _with_chr_prefix(loc_region)
+
+            # Get coordinates; results from the database already hold ints, so only coerce other types
+            start = raw_start = v if type(v := result['loc_start']) is int else int(v)
+            end = raw_end = v if type(v := result['loc_end']) is int else int(v)
+
+            # Unpadded location, reused by fields that repeat it (e.g. the sambamba name column)
+            raw = (raw_region, raw_start, raw_end)
 
-            # Get coordinates
-            start = int(result['loc_start'])
-            end = int(result['loc_end'])
-            
             # Apply padding if this is not a SNP
             if not result.get('is_snp', False):
-                padding_value = int(result.get('_padding', padding))
+                padding_value = v if type(v := result.get('_padding', padding)) is int else int(v)
                 if padding_value > 0:
                     start = max(0, start - padding_value)
                     end = end + padding_value
-            
-            # Format the basic BED fields
-            bed_line = f"{loc_region}\t{start}\t{end}"
-            
-            # Add format-specific fields
-            if format_type in cls.BED_FORMATS:
-                format_config = cls.BED_FORMATS[format_type]
-                additional_fields = []
-                for field_func in format_config['fields']:
-                    try:
-                        field_value = field_func(result, padding)
-                        additional_fields.append(str(field_value))
-                    except Exception as e:
-                        current_app.logger.error(f"Error processing field for format {format_type}: {str(e)}")
-                        raise
-                
-                if additional_fields:
-                    bed_line += '\t' + '\t'.join(additional_fields)
-
-            return bed_line
+
+            return row_fmt(result, loc_region, start, end, raw)
             
         except Exception as e:
-            current_app.logger.error(f"Error formatting BED line: {str(e)}")
-            current_app.logger.error(f"Result: {result}")
-            raise
+            raise BedFormatError(str(e), result) from e
+
+    @staticmethod
+    def _log_format_error(error: BedFormatError) -> None:
+        current_app.logger.error(f"Error formatting BED line: {str(error)}")
+        current_app.logger.error(f"Result: {error.result}")
 
     @classmethod
     def create_bed(cls, results: List[Dict], padding: int, format_type: str, add_chr_prefix: bool = False) -> str:
-        return '\n'.join([cls.format_bed_line(r, padding, format_type, add_chr_prefix) for r in results])
+        row_fmt = cls._row_formatter(format_type)
+        try:
+            return '\n'.join([cls._format_row(r, padding, row_fmt, add_chr_prefix) for r in results])
+        except BedFormatError as e:
+            cls._log_format_error(e)
+            raise
 
-    # Single factory method for generating BED content in any supported format
     @classmethod
-    def create_formatted_bed(cls, results: List[Dict], format_type: str, add_chr_prefix: bool = False) -> str:
-        """Creates formatted BED file content."""
-        print(f"\n=== BedGenerator.create_formatted_bed ===")
-        print(f"Format type: {format_type}")
-        
-        bed_lines = []
+    def iter_bed_lines(cls, results: List[Dict], format_type: str, add_chr_prefix: bool = False) -> Iterator[str]:
+        """
+        Yields formatted BED lines (without line terminators), skipping results that cannot be formatted.
+
+        Consumers that write or encode line by line never hold the whole file as one string.
+        """
+        logger = current_app.logger
+        # Resolved once so per-row diagnostics cost nothing unless DEBUG logging is on
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("Creating %s BED from %d results", format_type, len(results))
+
+        # Loop invariants bound once for the whole batch. Padding already present on a
+        # result is read from its '_padding' key, so no extra padding is ever passed in.
+        format_row = cls._format_row
+        row_fmt = cls._row_formatter(format_type)
         for result in results:
             try:
-                print(f"\nInput result:")
-                print(f"Gene: {result.get('gene')}")
-                print(f"Coordinates: {result.get('loc_start')}-{result.get('loc_end')}")
-                print(f"Existing padding: {result.get('_padding')}")
-                print(f"UTR info - 5': {result.get('five_prime_utr')}, 3': {result.get('three_prime_utr')}")
-                
-                # Don't apply additional padding if already present
-                padding = 0 if result.get('_padding') is not None else result.get('_padding', 0)
-                print(f"Applied padding: {padding}")
-                
-                bed_line = cls.format_bed_line(
-                    result=result,
-                    padding=padding,
-                    format_type=format_type,
-                    add_chr_prefix=add_chr_prefix
-                )
-                bed_lines.append(bed_line)
-            except Exception as e:
-                current_app.logger.error(f"Error formatting BED line: {str(e)}")
+                if debug:
+                    logger.debug("Formatting %s %s-%s (padding %s)", result.get('gene'),
+                                 result.get('loc_start'), result.get('loc_end'), result.get('_padding'))
+                bed_line = format_row(result, 0, row_fmt, add_chr_prefix)
+            except BedFormatError as e:
+                cls._log_format_error(e)
                 continue
-        
-        return '\n'.join(bed_lines)
+            yield bed_line
+
+    @classmethod
+    def iter_bed_chunks(cls, results: List[Dict], format_type: str, add_chr_prefix: bool = False,
+                        chunk_rows: int = 4096) -> Iterator[bytes]:
+        """
+        Yields formatted BED content as UTF-8 byte chunks of up to chunk_rows lines each.
+
+        Joined, the chunks equal create_formatted_bed_bytes' output; used to stream downloads.
+        """
+        chunk = []
+        sep = ''
+        for line in cls.iter_bed_lines(results, format_type, add_chr_prefix):
+            chunk.append(line)
+            if len(chunk) >= chunk_rows:
+                yield (sep + '\n'.join(chunk)).encode('utf-8')
+                chunk = []
+                sep = '\n'
+        if chunk:
+            yield (sep + '\n'.join(chunk)).encode('utf-8')
+
+    @classmethod
+    def create_formatted_bed_bytes(cls, results: List[Dict], format_type: str, add_chr_prefix: bool = False) -> bytes:
+        """
+        Creates formatted BED file content as UTF-8 bytes.
+
+        Lines are encoded straight into a per-thread bytearray that is kept between calls,
+        so generating many panels does not repeatedly allocate and grow an output buffer.
+        """
+        buf = getattr(_BUF, 'v', None)
+        if buf is None:
+            buf = _BUF.v = bytearray(BUF_INITIAL_SIZE)
+
+        # Overwrite in place from the start; slice assignment only grows buf when it is full
+        pos = 0
+        sep = b''
+        for line in cls.iter_bed_lines(results, format_type, add_chr_prefix):
+            chunk = sep + line.encode('utf-8')
+            end = pos + len(chunk)
+            buf[pos:end] = chunk
+            pos = end
+            sep = b'\n'
+
+        with memoryview(buf) as view:
+            content = bytes(view[:pos])
 
-def generate_bed_files(filename: str, results: List[Dict], settings: Dict) -> None:
+        if len(buf) > BUF_RETAIN_LIMIT:
+            _BUF.v = bytearray(BUF_INITIAL_SIZE)
+        return content
+
+# Upper bound on a single os.write call; larger payloads are written in slices of this size
+WRITE_CHUNK_SIZE = 1 << 20
+
+def write_bed_file(file_path: str, data: bytes) -> None:
+    """
+    Writes pre-encoded BED content to disk, bypassing Python's text and buffering layers.
+    """
+    fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view[:WRITE_CHUNK_SIZE])
+            view = view[written:]
+    finally:
+        os.close(fd)
+
+# BED types generated for review; a file's type is given by its filename suffix, e.g. 'panel_cnv'
+GENERATED_BED_TYPES = frozenset(('data', 'sambamba', 'exomeDepth', 'cnv'))
+
+def generate_bed_files(filename: str, results: List[Dict], settings: Dict, bed_file: Optional[BedFile] = None) -> None:
     """
     Generates different BED file formats and stores them both in the database and filesystem.
+
+    A caller that has just created the BedFile record can pass it in; its blob is then set
+    directly and committing is left to the caller's transaction. Otherwise the record is
+    looked up by filename and the update is committed here.
     """
     bed_dir = current_app.config.get('DRAFT_BED_FILES_DIR')
     os.makedirs(bed_dir, exist_ok=True)
 
-    # Map of bed types to their creation functions
-    bed_types = {
-        'data': lambda r, p: BedGenerator.create_formatted_bed(r, 'data', False),
-        'sambamba': lambda r, p: BedGenerator.create_formatted_bed(r, 'sambamba', False),
-        'exomeDepth': lambda r, p: BedGenerator.create_formatted_bed(r, 'exomeDepth', False),
-        'cnv': lambda r, p: BedGenerator.create_formatted_bed(r, 'cnv', False)
-    }
+    # Only the matching bed type for the current file is generated; its type is the filename suffix
+    bed_type = filename.rsplit('_', 1)[-1] if '_' in filename else None
+    if bed_type not in GENERATED_BED_TYPES:
+        return
+    data = BedGenerator.create_formatted_bed_bytes(results, bed_type, False)
 
-    # Get the actual filename without the type suffix
-    base_filename = filename.rsplit('_', 1)[0] if '_' in filename else filename
+    # Save to filesystem
+    file_path = os.path.join(bed_dir, f"{filename}.bed")
+    write_bed_file(file_path, data)
 
-    for bed_type, create_function in bed_types.items():
-        # Only process if this is the matching bed type for the current file
-        if filename.endswith(f"_{bed_type}"):
-            padding = settings.get('padding', {}).get(bed_type, 0)
-            content = create_function(results, padding)
-            
-            # Save to filesystem
-            file_path = os.path.join(bed_dir, f"{filename}.bed")
-            with open(file_path, 'w') as f:
-                f.write(content)
-                
-            # Save to database using the exact filename
-            bed_file = BedFile.query.filter_by(filename=filename).first()
-            if bed_file:
-                print(f"Found BedFile record for {filename}")
-                bed_file.file_blob = content.encode('utf-8')
-                db.session.add(bed_file)
-                db.session.commit()
-                break  # Exit after processing the matching type
\ No newline at end of file
+    if bed_file is not None:
+        bed_file.file_blob = data
+        return
+
+    # Save to database using the exact filename
+    record = BedFile.query.filter_by(filename=filename).first()
+    if record:
+        current_app.logger.debug("Found BedFile record for %s", filename)
+        record.file_blob = data
+        db.session.add(record)
+        db.session.commit()
\ No newline at end of file
@@ -3,13 +3,11 @@ database.py - Provides functions to store BED files and their entries in the dat
 
 Functions:
 - store_bed_file: Stores a BED file and its entries in the database, including UTR settings.
-- create_bed_file: Creates a new BED file record in the database with optional warning information.
 """
 
 from app import db
 from app.models import BedFile, BedEntry
 from typing import List, Dict
-import json
 
 def store_bed_file(file_name: str, results: List[Dict], user_id: int, initial_query: str, 
                   assembly: str, include_5utr: bool = False, include_3utr: bool = False) -> int:
@@ -32,38 +30,4 @@ def store_bed_file(file_name: str, results: List[Dict], user_id: int, initial_qu
     BedEntry.create_entries(new_bed_file.id, results)
     
     db.session.commit()
-    return new_bed_file.id
-
-def create_bed_file(file_name: str, user_id: int, initial_query: str, assembly: str) -> BedFile:
-    # Collect warnings from results
-    warnings = []
-    initial_query_data = json.loads(initial_query)
-    results = initial_query_data.get('results', [])
-    
-    for result in results:
-        if warning := result.get('warning'):
-            warnings.append({
-                'identifier': result.get('identifier'),
-                'message': warning.get('message'),
-                'type': warning.get('type')
-            })
-    
-    # Create a summary warning
-    file_warning = None
-    if warnings:
-        file_warning = json.dumps({
-            'summary': "Some transcripts require clinical review",
-            'details': warnings
-        })
-
-    new_bed_file = BedFile(
-        filename=file_name,
-        status='draft',
-        submitter_id=user_id,
-        initial_query=initial_query,
-        assembly=assembly,
-        warning=file_warning
-    )
-    db.session.add(new_bed_file)
-    db.session.flush()
-    return new_bed_file
\ No newline at end of file
+    return new_bed_file.id
\ No newline at end of file
@@ -5,44 +5,62 @@ Routes:
 - index(): Handles the main page for the bed generator, processing form submissions.
 - bulk_process(): Processes bulk genetic data submitted via a POST request.
 - results(): Displays the results of processed genetic data.
-- adjust_padding(): Adjusts padding for results based on user input.
 - adjust_utrs(): Adjusts UTRs for results based on user input.
 - panels(): Returns the list of panels as a JSON response.
 - refresh_panels(): Fetches and updates the panel data from an external source.
 - get_genes_by_panel(panel_id): Retrieves genes associated with a specific panel.
 - settings(): Displays and updates application settings.
 - submit_for_review(): Submits a BED file for review.
-- download_raw_bed(): Generates and returns a raw BED file.
-- download_custom_bed(bed_type): Generates and returns a custom BED file.
+- download_raw_bed(): Streams a raw BED file as a plain-text attachment.
+- download_custom_bed(bed_type): Streams a custom BED file as a plain-text attachment.
 - get_published_bed_files(): Retrieves a list of published BED files.
 - get_bed_files(): Retrieves a list of all BED files with their details.
 
 Functions:
-- fetch_panels_from_panelapp(): Fetches panel data from PanelApp API, handling pagination.
+- fetch_panelapp_page(url, page): Fetches a single page of PanelApp API results.
+- fetch_panels_from_panelapp(): Fetches panel data from PanelApp API, requesting result pages concurrently.
+- bed_download_response(results, format_type, filename, add_chr_prefix): Builds a streamed BED file download response.
+- create_draft_bed_file(filename, results, query, assembly, utr_settings, settings): Stores a draft BED file with its entries.
 """
 
-from flask import render_template, request, jsonify, session, current_app, redirect, url_for, flash
+from flask import render_template, request, jsonify, current_app, redirect, url_for, flash, Response, stream_with_context
 from typing import List, Dict, Optional
 from flask_login import current_user, login_required
 from app.bed_generator import bed_generator_bp
 from app.bed_generator.utils import (
-    store_panels_in_json, get_panels_from_json, load_settings, collect_warnings, increment_version_number, process_tark_data, fetch_genes_for_panel
+    store_panels_in_json, get_panels_from_json, get_panels_etag, load_settings, collect_warnings, increment_version_number, process_tark_data, fetch_genes_for_panel
+)
+from app.bed_generator.logic import (
+    process_form_data, store_results_in_session, pop_results_from_session, process_bulk_data, get_mane_plus_clinical_identifiers
 )
-from app.bed_generator.logic import process_form_data, store_results_in_session, process_bulk_data, get_mane_plus_clinical_identifiers, generate_bed_file
 from app.forms import SettingsForm, BedGeneratorForm
 from app.bed_generator.bed_generator import generate_bed_files, BedGenerator
-from app.models import BedFile, Settings, BedEntry
+from app.models import BedFile, Settings, BedEntry, User
 from app.bed_generator.database import store_bed_file
-import traceback
-import json
+import orjson
 from datetime import datetime 
 from app import db
 import re
 import requests
 import os
 import concurrent.futures
+from werkzeug.utils import secure_filename
+from sqlalchemy import func
 from typing import List, Dict, Tuple
 
+# R code in a formatted panel name, e.g. 'R134 - Familial hypercholesterolaemia'
+R_CODE_RE = re.compile(r'R(\d+)')
+# Upper bound on concurrent PanelApp page requests
+PANELAPP_MAX_WORKERS = 10
+
+def fetch_panelapp_page(url: str, page: Optional[int] = None) -> Dict:
+    """
+    Fetches a single page of PanelApp API results.
+    """
+    response = requests.get(url, params={'page': page} if page else None)
+    response.raise_for_status()
+    return response.json()
+
 def fetch_panels_from_panelapp():
     """
     Fetches panel data from PanelApp API, handling pagination.
@@ -51,17 +69,28 @@ def fetch_panels_from_panelapp():
     try:
         # PanelApp API base URL for signed-off panels
         base_url = "https://panelapp.genomicsengland.co.uk/api/v1/panels/signedoff/"
-        panels = []
-        next_url = base_url
-        
-        while next_url:
-            print(f"\nFetching from URL: {next_url}")
-            response = requests.get(next_url)
-            response.raise_for_status()
-            
-            data = response.json()
-            panels.extend(data.get('results', []))
-            next_url = data.get('next')
+
+        # The first page gives the total count, so the remaining pages can be requested concurrently
+        current_app.logger.debug("Fetching panels from URL: %s", base_url)
+        data = fetch_panelapp_page(base_url)
+        panels = list(data.get('results', []))
+        next_url = data.get('next')
+
+        page_size = len(panels)
+        if next_url and page_size and data.get('count', 0) > page_size:
+            page_count = -(-data['count'] // page_size)
+            pages = range(2, page_count + 1)
+            current_app.logger.debug("Fetching %d further panel pages", len(pages))
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(PANELAPP_MAX_WORKERS, len(pages))) as executor:
+                for page_data in executor.map(lambda page: fetch_panelapp_page(base_url, page), pages):
+                    panels.extend(page_data.get('results', []))
+        else:
+            # No count to plan from, so follow the 'next' links one page at a time
+            while next_url:
+                current_app.logger.debug("Fetching panels from URL: %s", next_url)
+                data = fetch_panelapp_page(next_url)
+                panels.extend(data.get('results', []))
+                next_url = data.get('next')
         
         # Extract relevant panel information
         panel_list = []
@@ -73,11 +102,6 @@ def fetch_panels_from_panelapp():
             panel_name = panel.get('name', '')
             formatted_name = f"{r_code} - {panel_name}" if r_code else panel_name
             
-            print(f"\nOriginal name: {panel_name}")
-            print(f"Relevant disorders: {relevant_disorders}")
-            print(f"R-code found: {r_code}")
-            print(f"Formatted name: {formatted_name}")
-            
             panel_list.append({
                 'id': panel.get('id'),
                 'name': formatted_name,
@@ -88,13 +112,11 @@ def fetch_panels_from_panelapp():
         
         # Sort panels by the 'R' code
         def get_r_number(panel):
-            r_match = re.search(r'R(\d+)', panel['name'])
+            r_match = R_CODE_RE.search(panel['name'])
             return int(r_match.group(1)) if r_match else float('inf')
         
         panel_list.sort(key=get_r_number)
         
-        print(f"\nFirst 3 sorted panels: {[p['name'] for p in panel_list[:3] if panel_list]}")
-        
         return panel_list
         
     except requests.RequestException as e:
@@ -131,17 +153,7 @@ def bulk_process():
     data = request.get_json()
     try:
         results, no_data_identifiers = process_bulk_data(data)
-        # Only add original locations if they don't already exist
-        for result in results:
-            if isinstance(result, dict):
-                if 'original_loc_start' not in result:
-                    result['original_loc_start'] = result.get('loc_start')
-                if 'original_loc_end' not in result:
-                    result['original_loc_end'] = result.get('loc_end')
-        
-        session['results'] = results
-        session['assembly'] = data.get('assembly', 'GRCh38')
-        session['initial_query'] = data.get('initial_query', {})
+        store_results_in_session(results, [], data.get('assembly', 'GRCh38'), data.get('initial_query', {}))
         return jsonify({
             'success': True, 
             'message': 'Data processed successfully',
@@ -159,20 +171,12 @@ def results():
     """
     Displays the results of processed genetic data.
     
-    Retrieves results from the session and renders them on the results page.
+    Retrieves results stored for the session, clearing them, and renders them on the results page.
     """
-    results = session.get('results', [])
-    assembly = session.get('assembly', 'GRCh38')
-    initial_query = session.get('initial_query', {})
-    no_data_identifiers = session.get('no_data_identifiers', [])
-    
-    print("Results:", results)
-    print("assembly:", assembly)
-    print("No data identifiers:", no_data_identifiers)
+    results, no_data_identifiers, assembly, initial_query = pop_results_from_session()
     
-    session['results'] = []
-    session['initial_query'] = {}
-    session['no_data_identifiers'] = []
+    current_app.logger.debug("Showing %d results (assembly %s, %d identifiers without data)",
+                             len(results), assembly, len(no_data_identifiers))
     
     mane_plus_clinical_identifiers = get_mane_plus_clinical_identifiers(results)
     has_mane_plus_clinical = bool(mane_plus_clinical_identifiers)
@@ -183,86 +187,31 @@ def results():
         assembly=assembly,
         has_mane_plus_clinical=has_mane_plus_clinical,
         mane_plus_clinical_identifiers=list(mane_plus_clinical_identifiers),
-        initial_query=json.dumps(initial_query),
+        initial_query=initial_query,
         no_data_identifiers=no_data_identifiers,
         settings=settings.to_dict()
     )
 
-@bed_generator_bp.route('/adjust_padding', methods=['POST'])
-def adjust_padding():
-    """
-    Adjusts the padding for results while preserving UTR settings.
-    """
-    data = request.get_json()
-    padding_5 = int(data.get('padding_5', 0))
-    padding_3 = int(data.get('padding_3', 0))
-    use_separate_snp_padding = data.get('use_separate_snp_padding', False)
-    snp_padding_5 = int(data.get('snp_padding_5', padding_5))
-    snp_padding_3 = int(data.get('snp_padding_3', padding_3))
-    results = data.get('results', [])
-    is_padding_update = data.get('is_padding_update', False)
-
-    adjusted_results = []
-    for result in results:
-        adjusted = result.copy()
-        
-        # Skip padding for genomic coordinates
-        if result.get('is_genomic_coordinate', False):
-            adjusted_results.append(adjusted)
-            continue
-
-        # Determine if this is a SNP entry
-        is_snp = bool(result.get('rsid')) or result.get('is_snp', False)
-        
-        # Skip padding if this is a SNP and separate SNP padding is not enabled
-        if is_snp and not use_separate_snp_padding:
-            adjusted_results.append(adjusted)
-            continue
-
-        # Get strand information (default to forward/1 if not specified)
-        strand = result.get('strand', 1)
-        
-        # If this is a padding update, we need to use the original coordinates
-        if is_padding_update:
-            # Get original coordinates (before any padding)
-            original_start = result.get('original_start', result['loc_start'])
-            original_end = result.get('original_end', result['loc_end'])
-            
-            # Store original coordinates if not already stored
-            if 'original_start' not in adjusted:
-                adjusted['original_start'] = original_start
-                adjusted['original_end'] = original_end
-            
-            # Determine which padding values to use
-            if is_snp and use_separate_snp_padding:
-                pad_5 = snp_padding_5
-                pad_3 = snp_padding_3
-            else:
-                pad_5 = padding_5
-                pad_3 = padding_3
-
-            # Apply padding based on strand direction
-            if strand > 0:  # Forward strand
-                adjusted['loc_start'] = original_start - pad_5
-                adjusted['loc_end'] = original_end + pad_3
-            else:  # Reverse strand
-                adjusted['loc_start'] = original_start - pad_3
-                adjusted['loc_end'] = original_end + pad_5
-        
-        adjusted_results.append(adjusted)
-
-    return jsonify({
-        'success': True,
-        'results': adjusted_results
-    })
-
 @bed_generator_bp.route('/panels')
 def panels():
     """
     Returns the list of panels and last updated timestamp as a JSON response.
+
+    The response carries an ETag tied to the panels file and Cache-Control: no-cache, so
+    clients revalidate on every request and get a 304 without a body until the panels
+    are refreshed.
     """
-    panel_data, last_updated = get_panels_from_json()
-    return jsonify({'panels': panel_data, 'last_updated': last_updated})
+    etag = get_panels_etag()
+    if etag and request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        panel_data, last_updated = get_panels_from_json()
+        response = jsonify({'panels': panel_data, 'last_updated': last_updated})
+
+    if etag:
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+    return response
 
 @bed_generator_bp.route('/refresh_panels')
 def refresh_panels():
@@ -300,7 +249,7 @@ def get_genes_by_panel(panel_id):
         else:
             return jsonify({'gene_list': [], 'error': 'No genes found for this panel'})
     except Exception as e:
-        print(f"Error fetching genes for panel {panel_id}: {str(e)}")
+        current_app.logger.error(f"Error fetching genes for panel {panel_id}: {str(e)}")
         return jsonify({'gene_list': [], 'error': f'Error fetching genes: {str(e)}'})
 
 
@@ -325,6 +274,28 @@ def settings():
     Settings.get_settings().populate_form(form)
     return render_template('settings.html', form=form)
 
+def create_draft_bed_file(filename: str, results: List[Dict], query: Dict, assembly: str,
+                          utr_settings: Dict, settings: Dict) -> BedFile:
+    """
+    Creates a draft BED file record with its entries and generated file content.
+    Nothing is committed; the caller commits once all files for a submission are stored.
+    """
+    bed_file = BedFile(
+        filename=filename,
+        status='draft',
+        submitter_id=current_user.id,
+        initial_query=orjson.dumps(query).decode(),
+        assembly=assembly,
+        include_5utr=utr_settings['include_5utr'],
+        include_3utr=utr_settings['include_3utr']
+    )
+    db.session.add(bed_file)
+    db.session.flush()
+
+    BedEntry.create_entries(bed_file.id, results)
+    generate_bed_files(filename, results, settings, bed_file=bed_file)
+    return bed_file
+
 @bed_generator_bp.route('/submit_for_review', methods=['POST'])
 @login_required
 def submit_for_review():
@@ -335,9 +306,10 @@ def submit_for_review():
         data = request.get_json()
         file_name = data.get('fileName')
         results = data.get('results', [])
-        initial_query = json.loads(data.get('initialQuery'))
+        initial_query = orjson.loads(data.get('initialQuery'))
         assembly = data.get('assembly')
         settings = Settings.get_settings()
+        settings_dict = settings.to_dict()
 
         # Process base BED file if requested
         if data.get('baseOnly', False):
@@ -356,26 +328,14 @@ def submit_for_review():
             base_query = initial_query.copy()
             base_query['settings'] = base_settings
             
-            base_bed_file = BedFile(
-                filename=file_name,
-                status='draft',
-                submitter_id=current_user.id,
-                initial_query=json.dumps(base_query),
-                assembly=assembly,
-                include_5utr=base_settings['include_5utr'],
-                include_3utr=base_settings['include_3utr']
-            )
-            db.session.add(base_bed_file)
-            db.session.flush()
-            
-            # Create entries and generate file
-            BedEntry.create_entries(base_bed_file.id, processed_results)
-            from app.bed_generator.bed_generator import generate_bed_files as bed_generator_generate_files
-            bed_generator_generate_files(file_name, processed_results, settings.to_dict())
+            # Everything is committed together below
+            create_draft_bed_file(file_name, processed_results, base_query, assembly, base_settings, settings_dict)
             
         else:
             # Process each BED type
             bed_types = ['data', 'sambamba', 'exomeDepth', 'cnv']
+            # Types with identical UTR and padding settings share one set of adjusted coordinates
+            processed_by_settings = {}
             
             for bed_type in bed_types:
                 # Get settings for this bed type
@@ -383,44 +343,35 @@ def submit_for_review():
                     'include_5utr': getattr(settings, f'{bed_type}_include_5utr', False),
                     'include_3utr': getattr(settings, f'{bed_type}_include_3utr', False)
                 }
+                padding = getattr(settings, f'{bed_type}_padding', 0)
+                snp_padding = getattr(settings, f'{bed_type}_snp_padding', 0)
                 
-                # Process entries for this type
-                processed_results = process_bed_entries(
-                    results,
-                    settings=type_settings,
-                    padding=getattr(settings, f'{bed_type}_padding', 0),
-                    snp_padding=getattr(settings, f'{bed_type}_snp_padding', 0)
-                )
+                # Process entries for this type, reusing a previous type's output when the settings match
+                settings_key = (type_settings['include_5utr'], type_settings['include_3utr'], padding, snp_padding)
+                processed_results = processed_by_settings.get(settings_key)
+                if processed_results is None:
+                    processed_results = processed_by_settings[settings_key] = process_bed_entries(
+                        results,
+                        settings=type_settings,
+                        padding=padding,
+                        snp_padding=snp_padding
+                    )
                 
                 # Create type-specific query
                 type_query = initial_query.copy()
                 type_query['settings'] = {
                     **type_settings,
                     'padding': {
-                        'standard': getattr(settings, f'{bed_type}_padding', 0),
-                        'snp': getattr(settings, f'{bed_type}_snp_padding', 0)
+                        'standard': padding,
+                        'snp': snp_padding
                     },
                     'bed_type': bed_type
                 }
                 
-                # Create BED file record
-                type_filename = f"{file_name}_{bed_type}"
-                bed_file = BedFile(
-                    filename=type_filename,
-                    status='draft',
-                    submitter_id=current_user.id,
-                    initial_query=json.dumps(type_query),
-                    assembly=assembly,
-                    include_5utr=type_settings['include_5utr'],
-                    include_3utr=type_settings['include_3utr']
+                # Create BED file record; everything is committed together below
+                create_draft_bed_file(
+                    f"{file_name}_{bed_type}", processed_results, type_query, assembly, type_settings, settings_dict
                 )
-                db.session.add(bed_file)
-                db.session.flush()
-                
-                # Create entries and generate file
-                BedEntry.create_entries(bed_file.id, processed_results)
-                from app.bed_generator.bed_generator import generate_bed_files as bed_generator_generate_files
-                bed_generator_generate_files(type_filename, processed_results, settings.to_dict())
         
         db.session.commit()
         return jsonify({'success': True})
@@ -431,6 +382,18 @@ def submit_for_review():
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def bed_download_response(results: List[Dict], format_type: str, filename: str, add_chr_prefix: bool = False) -> Response:
+    """
+    Streams BED content as a plain-text attachment. Lines are formatted and sent in chunks
+    as the response is written, rather than built into one string and JSON-escaped.
+    """
+    chunks = BedGenerator.iter_bed_chunks(results, format_type, add_chr_prefix)
+    return Response(
+        stream_with_context(chunks),
+        mimetype='text/plain',
+        headers={'Content-Disposition': f'attachment; filename="{secure_filename(filename)}"'}
+    )
+
 @bed_generator_bp.route('/download_raw_bed', methods=['POST'])
 def download_raw_bed():
     try:
@@ -454,9 +417,7 @@ def download_raw_bed():
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"{filename_prefix}_{timestamp}_raw.bed" if filename_prefix else f"{timestamp}_raw.bed"
         
-        bed_content = BedGenerator.create_formatted_bed(adjusted_results, 'raw', 0, add_chr_prefix)
-        
-        return jsonify({'content': bed_content, 'filename': filename})
+        return bed_download_response(adjusted_results, 'raw', filename, add_chr_prefix)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -482,17 +443,13 @@ def download_custom_bed(bed_type):
             snp_padding=getattr(settings, f'{bed_type}_snp_padding', 0)
         )
         
-        # Generate BED file content
-        bed_content = BedGenerator.create_formatted_bed(
-            results=processed_results,
-            format_type=bed_type,
+        # Stream the BED file content
+        return bed_download_response(
+            processed_results,
+            bed_type,
+            f"{data.get('filename', 'custom')}_{bed_type}.bed",
             add_chr_prefix=data.get('addChrPrefix', False)
         )
-        
-        return jsonify({
-            'content': bed_content,
-            'filename': f"{data.get('filename', 'custom')}_{bed_type}.bed"
-        })
     except Exception as e:
         current_app.logger.error(f"Error in download_custom_bed: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -501,8 +458,8 @@ def download_custom_bed(bed_type):
 @login_required
 def get_published_bed_files():
     try:
-        published_files = BedFile.query.filter_by(status='published').all()
-        files_data = [{'id': file.id, 'filename': file.filename} for file in published_files]
+        published_files = BedFile.query.filter_by(status='published').with_entities(BedFile.id, BedFile.filename).all()
+        files_data = [{'id': file_id, 'filename': filename} for file_id, filename in published_files]
         return jsonify({'success': True, 'bed_files': files_data})
     except Exception as e:
         current_app.logger.error(f"Error in get_published_bed_files: {str(e)}")
@@ -510,19 +467,56 @@ def get_published_bed_files():
 
 @bed_generator_bp.route('/get_bed_files')
 def get_bed_files():
+    """
+    Lists BED files, newest first. Optional query params:
+    - status: only return files with this status
+    - page / per_page: return a single page plus the total count; without 'page' every file is returned
+    """
     try:
-        bed_files = BedFile.query.all()
+        # Where the database can format the timestamp itself, rows arrive as ready-made strings
+        # rather than being parsed into datetimes and formatted again here
+        dialect = db.engine.dialect.name
+        if dialect == 'sqlite':
+            created_at_text = func.strftime('%Y-%m-%d %H:%M:%S', BedFile.created_at)
+        elif dialect == 'postgresql':
+            created_at_text = func.to_char(BedFile.created_at, 'YYYY-MM-DD HH24:MI:SS')
+        else:
+            created_at_text = None
+        created_at = BedFile.created_at if created_at_text is None else created_at_text.label('created_at')
+
+        # Only the listed columns, with the submitter joined in; the file blob and query text are never loaded
+        query = BedFile.query.with_entities(
+            BedFile.id, BedFile.filename, BedFile.status, User.username, created_at,
+            BedFile.assembly, BedFile.include_3utr, BedFile.include_5utr
+        ).outerjoin(User, BedFile.submitter_id == User.id)
+
+        status = request.args.get('status')
+        if status:
+            query = query.filter(BedFile.status == status)
+        query = query.order_by(BedFile.created_at.desc())
+
+        page = request.args.get('page', type=int)
+        pagination = None
+        if page is not None:
+            per_page = request.args.get('per_page', 50, type=int)
+            pagination = query.paginate(page=page, per_page=per_page, max_per_page=200, error_out=False)
+            bed_files = pagination.items
+        else:
+            bed_files = query.all()
         files_data = [{
             'id': file.id,
             'filename': file.filename,
             'status': file.status,
-            'submitter': file.submitter.username if file.submitter else 'Unknown',
-            'created_at': file.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'submitter': file.username or 'Unknown',
+            'created_at': file.created_at if created_at_text is not None else file.created_at.strftime('%Y-%m-%d %H:%M:%S'),
             'assembly': file.assembly,
             'include_3utr': file.include_3utr,
             'include_5utr': file.include_5utr
         } for file in bed_files]
-        return jsonify({'success': True, 'bed_files': files_data})
+        response = {'success': True, 'bed_files': files_data}
+        if pagination is not None:
+            response.update(total=pagination.total, page=pagination.page, per_page=pagination.per_page)
+        return jsonify(response)
     except Exception as e:
         current_app.logger.error(f"Error in get_bed_files: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -8,6 +8,7 @@ Functions:
 - process_coordinates: Processes a list of genomic coordinates, fetching overlapping gene information.
 - store_panels_in_json: Stores panel data in a JSON file, formatting the panel names.
 - get_panels_from_json: Retrieves panel data from a JSON file.
+- get_panels_etag: Returns an ETag identifying the current version of the panels JSON file.
 - collect_warnings: Collects and formats warnings from results.
 - increment_version_number: Creates a new version number for an existing BED file.
 - standardize_result: Standardizes result structure across all entry types.
@@ -16,16 +17,27 @@ Functions:
 import re
 import os
 import concurrent.futures
+import threading
 import json
-from flask import current_app
+import orjson
 from app.models import Settings
 from typing import List, Dict, Tuple, Any, Optional
 from .api import fetch_variant_info, fetch_data_from_tark, fetch_coordinate_info, fetch_genes_for_panel
 import datetime
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Constants
 PANELS_JSON_PATH = os.path.join(os.path.dirname(__file__), 'panels.json')
 GENES_JSON_PATH = os.path.join(os.path.dirname(__file__), 'genes.json')
+# Version suffix at the end of a BED filename, e.g. 'panel_v3'
+VERSION_SUFFIX_RE = re.compile(r'_v(\d+)$')
+
+# Parsed contents of the panels JSON file, reused until the file's modification time changes
+_panels_cache = {'mtime': None, 'data': None}
+# Serialises reloads so concurrent requests after a change parse the file only once
+_panels_lock = threading.Lock()
 
 def load_settings():
     settings = Settings.get_settings()
@@ -34,11 +46,12 @@ def load_settings():
 def process_identifiers(identifiers: List[str], assembly: str, include_5utr: bool, include_3utr: bool) -> Tuple[List[Dict[str, Any]], List[str]]:
     """
     Processes a list of genetic identifiers in parallel, fetching data and applying UTR and padding adjustments.
+    Returns a flat list of result dicts, one per transcript or variant, and the identifiers with no data.
     """
     results = []
     no_data_identifiers = []
     
-    print(f"\n=== Starting batch processing of {len(identifiers)} identifiers ===")
+    logger.debug("Starting batch processing of %d identifiers", len(identifiers))
     
     # Group identifiers by type for batch processing
     rsids = []
@@ -49,26 +62,24 @@ def process_identifiers(identifiers: List[str], assembly: str, include_5utr: boo
         else:
             other_identifiers.append(identifier)
     
-    print(f"Found {len(rsids)} rsIDs and {len(other_identifiers)} other identifiers")
+    logger.debug("Found %d rsIDs and %d other identifiers", len(rsids), len(other_identifiers))
     
     with concurrent.futures.ThreadPoolExecutor(max_workers=100) as executor:
         future_to_id = {}
         
         # Submit rsIDs for processing
         for rsid in rsids:
-            print(f"Submitting rsID: {rsid}")
             future_to_id[executor.submit(fetch_variant_info, rsid, assembly)] = rsid
         
         # Submit other identifiers for processing
         for identifier in other_identifiers:
-            print(f"Submitting identifier: {identifier}")
             future_to_id[executor.submit(fetch_data_from_tark, identifier, assembly)] = identifier
         
         # Process completed futures
         for future in concurrent.futures.as_completed(future_to_id):
             identifier = future_to_id[future]
             try:
-                print(f"\n=== Processing results for {identifier} ===")
+                logger.debug("Processing results for %s", identifier)
                 data = future.result()
                 
                 if data:
@@ -77,7 +88,7 @@ def process_identifiers(identifiers: List[str], assembly: str, include_5utr: boo
                         if assembly == 'GRCh37' and not any(d.get('assembly_name') == 'GRCh37' for d in data):
                             mane_select = next((d for d in data if d.get('mane_transcript_type') == 'MANE SELECT'), None)
                             if mane_select and mane_select.get('stable_id'):
-                                print(f"Attempting secondary lookup using MANE SELECT stable_id: {mane_select['stable_id']}")
+                                logger.debug("Attempting secondary lookup using MANE SELECT stable_id: %s", mane_select['stable_id'])
                                 secondary_data = fetch_data_from_tark(mane_select['stable_id'], assembly)
                                 if secondary_data:
                                     if isinstance(secondary_data, list):
@@ -95,7 +106,6 @@ def process_identifiers(identifiers: List[str], assembly: str, include_5utr: boo
                                 continue
                             processed_r = process_tark_data(r, include_5utr, include_3utr)
                             if processed_r:
-                                print(f"Processed: Gene={processed_r.get('gene')}, EntrezID={processed_r.get('entrez_id')}")
                                 results.append(processed_r)
                     else:
                         # Handle VariantInfo dataclass
@@ -115,18 +125,16 @@ def process_identifiers(identifiers: List[str], assembly: str, include_5utr: boo
                             'is_snp': True,
                             'mane_transcript_type': None
                         }
-                        print(f"Processed SNP: {variant_dict['rsid']}")
                         results.append(variant_dict)
                 else:
-                    print(f"No data found for {identifier}")
+                    logger.debug("No data found for %s", identifier)
                     no_data_identifiers.append(identifier)
             except Exception as e:
-                print(f"Error processing identifier {identifier}: {e}")
+                logger.error(f"Error processing identifier {identifier}: {e}")
                 no_data_identifiers.append(identifier)
     
-    print(f"\n=== Batch processing complete ===")
-    print(f"Successfully processed: {len(results)} results")
-    print(f"Failed to process: {len(no_data_identifiers)} identifiers")
+    logger.debug("Batch processing complete: %d results, %d identifiers failed",
+                 len(results), len(no_data_identifiers))
     
     return results, no_data_identifiers
 
@@ -160,6 +168,7 @@ def process_tark_data(r: Dict[str, Any], include_5utr: bool, include_3utr: bool)
 def process_coordinates(coordinates: List[str], assembly: str = 'GRCh38') -> List[Dict[str, Any]]:
     """
     Processes a list of genomic coordinates in parallel, fetching overlapping gene information.
+    Returns a flat list of result dicts, one per overlapping gene.
     """
     results = []
     with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
@@ -176,7 +185,7 @@ def process_coordinates(coordinates: List[str], assembly: str = 'GRCh38') -> Lis
                         item['is_genomic_coordinate'] = True
                     results.extend(data)
             except Exception as e:
-                print(f"Error processing coordinate {coord}: {e}")
+                logger.error(f"Error processing coordinate {coord}: {e}")
     
     return results
 
@@ -208,37 +217,64 @@ def store_panels_in_json(panels_data: List[Dict[str, Any]]) -> None:
         
         with open(PANELS_JSON_PATH, 'w') as json_file:
             json.dump(data_to_store, json_file, indent=2)
+        _panels_cache['mtime'] = None
             
-        current_app.logger.info(f"Successfully stored {len(panels_data)} panels to {PANELS_JSON_PATH}")
+        logger.info(f"Successfully stored {len(panels_data)} panels to {PANELS_JSON_PATH}")
         
     except Exception as e:
-        current_app.logger.error(f"Error storing panels in JSON: {str(e)}")
+        logger.error(f"Error storing panels in JSON: {str(e)}")
         raise
 
+def get_panels_etag() -> Optional[str]:
+    """
+    Returns an ETag for the panels JSON file, derived from its modification time,
+    or None if the file does not exist. It changes whenever the panels are refreshed.
+    """
+    try:
+        return format(os.stat(PANELS_JSON_PATH).st_mtime_ns, 'x')
+    except FileNotFoundError:
+        return None
+
 def get_panels_from_json() -> Tuple[List[Dict[str, Any]], str]:
     """
     Retrieves panel data and last updated timestamp from a JSON file.
+    The parsed file is kept in memory and only re-read when its modification time changes.
     """
-    if not os.path.exists(PANELS_JSON_PATH):
-        current_app.logger.warning(f"Panels JSON file not found at {PANELS_JSON_PATH}")
+    try:
+        mtime = os.stat(PANELS_JSON_PATH).st_mtime_ns
+    except FileNotFoundError:
+        logger.warning(f"Panels JSON file not found at {PANELS_JSON_PATH}")
         return [], ''
+
+    if _panels_cache['mtime'] == mtime:
+        return _panels_cache['data']
         
-    try:
-        with open(PANELS_JSON_PATH, 'r') as json_file:
-            data = json.load(json_file)
-            
-        if isinstance(data, dict):
-            return data.get('panels', []), data.get('last_updated', '')
-        elif isinstance(data, list):
-            current_app.logger.warning("Found old format panels JSON (list instead of dict)")
-            return data, ''
-        else:
-            current_app.logger.error(f"Unexpected data format in panels JSON: {type(data)}")
+    with _panels_lock:
+        # Another request may have reloaded the file while this one waited
+        if _panels_cache['mtime'] == mtime:
+            return _panels_cache['data']
+
+        try:
+            with open(PANELS_JSON_PATH, 'rb') as json_file:
+                data = orjson.loads(json_file.read())
+                
+            if isinstance(data, dict):
+                panels_data = data.get('panels', []), data.get('last_updated', '')
+            elif isinstance(data, list):
+                logger.warning("Found old format panels JSON (list instead of dict)")
+                panels_data = data, ''
+            else:
+                logger.error(f"Unexpected data format in panels JSON: {type(data)}")
+                return [], ''
+
+            # Data is set before the mtime so a reader never sees the new mtime with the old data
+            _panels_cache['data'] = panels_data
+            _panels_cache['mtime'] = mtime
+            return panels_data
+                
+        except Exception as e:
+            logger.error(f"Error reading panels from JSON: {str(e)}")
             return [], ''
-            
-    except Exception as e:
-        current_app.logger.error(f"Error reading panels from JSON: {str(e)}")
-        return [], ''
 
 def collect_warnings(results: List[Dict]) -> Optional[str]:
     """
@@ -254,20 +290,20 @@ def collect_warnings(results: List[Dict]) -> Optional[str]:
             })
     
     if warnings:
-        return json.dumps({
+        return orjson.dumps({
             'summary': "Some transcripts require clinical review",
             'details': warnings
-        })
+        }).decode()
     return None
 
 def increment_version_number(filename: str) -> str:
     """
     Creates a new version number for an existing BED file.
     """
-    match = re.search(r'_v(\d+)$', filename)
+    match = VERSION_SUFFIX_RE.search(filename)
     if match:
         current_version = int(match.group(1))
-        return re.sub(r'_v\d+$', f'_v{current_version + 1}', filename)
+        return f"{filename[:match.start()]}_v{current_version + 1}"
     return f"{filename}_v2"
 
 def standardize_result(result: Dict[str, Any]) -> Dict[str, Any]:
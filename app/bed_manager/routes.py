@@ -12,13 +12,15 @@ Routes:
 - download_bed_file(file_id): Downloads a specific BED file.
 """
 
-from flask import render_template, request, redirect, url_for, flash, jsonify, session, send_file
+from flask import render_template, request, redirect, url_for, flash, jsonify, send_file
 from flask_login import login_required, current_user
+from sqlalchemy.orm import load_only
 from app.bed_manager import bed_manager_bp
 from app.models import BedFile, BedEntry
+from app.bed_generator.logic import store_results_in_session
+from app.bed_generator.utils import VERSION_SUFFIX_RE, increment_version_number
 from app import db
 from io import BytesIO
-import re
 import json
 
 @bed_manager_bp.route('/')
@@ -50,7 +52,8 @@ def bed_file_details(file_id):
     bed_file = BedFile.query.options(db.joinedload(BedFile.entries)).get_or_404(file_id)
     
     # Extract the base filename without the version suffix
-    base_filename = re.sub(r'_v\d+$', '', bed_file.filename)
+    version_match = VERSION_SUFFIX_RE.search(bed_file.filename)
+    base_filename = bed_file.filename[:version_match.start()] if version_match else bed_file.filename
     
     # Filter published files to only include those with matching base filenames
     published_files = BedFile.query.filter(
@@ -61,10 +64,9 @@ def bed_file_details(file_id):
     # Find the previous version of the file
     previous_version = None
     if bed_file.status == 'draft':
-        match = re.search(r'_v(\d+)$', bed_file.filename)
-        if match:
-            current_version = int(match.group(1))
-            previous_version_name = re.sub(r'_v\d+$', f'_v{current_version - 1}', bed_file.filename)
+        if version_match:
+            current_version = int(version_match.group(1))
+            previous_version_name = f"{base_filename}_v{current_version - 1}"
             previous_version = BedFile.query.filter_by(filename=previous_version_name, status='published').first()
     
     return render_template('bed_manager/bed_file_details.html', 
@@ -78,7 +80,10 @@ def authorise_bed_file(file_id):
     if not current_user.is_authorizer:
         return jsonify({'success': False, 'error': 'You do not have permission to authorise files.'}), 403
 
-    bed_file = BedFile.query.get_or_404(file_id)
+    # Only the columns read or changed here; the file blob is never loaded
+    bed_file = BedFile.query.options(
+        load_only(BedFile.id, BedFile.filename, BedFile.status, BedFile.warning, BedFile.authorizer_id)
+    ).get_or_404(file_id)
     
     if bed_file.status == 'published':
         return jsonify({'success': False, 'error': 'This file is already published.'}), 400
@@ -96,7 +101,7 @@ def authorise_bed_file(file_id):
 
         if file_action == 'new':
             # Check if the filename already has a version
-            if not re.search(r'_v\d+$', bed_file.filename):
+            if not VERSION_SUFFIX_RE.search(bed_file.filename):
                 # If not, append _v1 to the filename
                 bed_file.filename = f"{bed_file.filename}_v1"
             
@@ -105,7 +110,9 @@ def authorise_bed_file(file_id):
             message = f'The new BED file "{bed_file.filename}" was successfully published and is now available for analysis.'
         else:
             # Get the existing published file
-            existing_file = BedFile.query.get(int(file_action))
+            existing_file = db.session.get(
+                BedFile, int(file_action), options=[load_only(BedFile.id, BedFile.filename, BedFile.status)]
+            )
             if not existing_file:
                 return jsonify({'success': False, 'error': 'Selected file for increment not found.'}), 404
 
@@ -113,12 +120,7 @@ def authorise_bed_file(file_id):
             existing_file.status = 'retired'
 
             # Update the version number in the filename
-            match = re.search(r'_v(\d+)$', existing_file.filename)
-            if match:
-                current_version = int(match.group(1))
-                bed_file.filename = re.sub(r'_v\d+$', f'_v{current_version + 1}', existing_file.filename)
-            else:
-                bed_file.filename = f"{existing_file.filename}_v2"
+            bed_file.filename = increment_version_number(existing_file.filename)
 
             # Update the pending file to published status
             bed_file.status = 'published'
@@ -138,7 +140,7 @@ def reload_bed_results(file_id):
     bed_file = BedFile.query.get_or_404(file_id)
     
     # Store the results in the session
-    session['results'] = [
+    results = [
         {
             'loc_region': entry.chromosome,
             'loc_start': entry.start,
@@ -154,7 +156,7 @@ def reload_bed_results(file_id):
         }
         for entry in bed_file.entries
     ]
-    session['assembly'] = bed_file.assembly
+    store_results_in_session(results, [], bed_file.assembly, {})
     
     return jsonify({
         'success': True,
@@ -12,6 +12,7 @@ as needed for the application's functionality.
 """
 
 from .extensions import db
+from flask import g, has_app_context
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from hashlib import pbkdf2_hmac
@@ -56,6 +57,12 @@ class BedFile(db.Model):
     authorizer = db.relationship('User', foreign_keys=[authorizer_id], backref='authorized_bed_files')
     entries = db.relationship('BedEntry', back_populates='bed_file', cascade='all, delete-orphan')
 
+    # Status lookups (published file lists, filtered and paginated listings) are served from
+    # this index, already ordered by creation time; it also covers status-only filters
+    __table_args__ = (
+        db.Index('ix_bedfile_status_created', 'status', 'created_at'),
+    )
+
 class BedEntry(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     bed_file_id = db.Column(db.Integer, db.ForeignKey('bed_file.id'), nullable=False)
@@ -74,27 +81,33 @@ class BedEntry(db.Model):
     bed_file = db.relationship('BedFile', back_populates='entries')
 
     @classmethod
-    def create_entries(cls, bed_file_id: int, results: List[Dict]) -> List['BedEntry']:
-        """Creates BED entries for a given file ID."""
-        entries = []
-        for result in results:
-            entry = cls(
-                bed_file_id=bed_file_id,
-                chromosome=result['loc_region'],
-                start=result['loc_start'],
-                end=result['loc_end'],
-                entrez_id=result['entrez_id'],
-                gene=result['gene'],
-                accession=result['accession'],
-                exon_id=result.get('exon_id'),
-                exon_number=result.get('exon_number'),
-                transcript_biotype=result.get('transcript_biotype'),
-                mane_transcript=result.get('mane_transcript'),
-                status=result.get('status')
-            )
-            entries.append(entry)
-            db.session.add(entry)
-        return entries
+    def create_entries(cls, bed_file_id: int, results: List[Dict]) -> List[Dict]:
+        """
+        Creates BED entries for a given file ID.
+
+        Rows are inserted with a single Core executemany INSERT rather than one ORM object
+        per entry, so the BedFile must already have been flushed. Returns the inserted row mappings.
+        """
+        mappings = [
+            {
+                'bed_file_id': bed_file_id,
+                'chromosome': result['loc_region'],
+                'start': result['loc_start'],
+                'end': result['loc_end'],
+                'entrez_id': result['entrez_id'],
+                'gene': result['gene'],
+                'accession': result['accession'],
+                'exon_id': result.get('exon_id'),
+                'exon_number': result.get('exon_number'),
+                'transcript_biotype': result.get('transcript_biotype'),
+                'mane_transcript': result.get('mane_transcript'),
+                'status': result.get('status')
+            }
+            for result in results
+        ]
+        if mappings:
+            db.session.execute(cls.__table__.insert(), mappings)
+        return mappings
 
 class Settings(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -117,11 +130,16 @@ class Settings(db.Model):
 
     @classmethod
     def get_settings(cls):
+        """Returns the settings row, querying it at most once per application context."""
+        if has_app_context() and (cached := g.get('_settings_cache')) is not None:
+            return cached
         settings = cls.query.first()
         if not settings:
             settings = cls()
             db.session.add(settings)
             db.session.commit()
+        if has_app_context():
+            g._settings_cache = settings
         return settings
 
     def to_dict(self):
@@ -157,6 +175,7 @@ class Settings(db.Model):
         for field in fields:
             setattr(self, field, getattr(form, field).data)
         db.session.commit()
+        g.pop('_settings_cache', None)
 
     def populate_form(self, form):
         """Populates a form with current settings values."""
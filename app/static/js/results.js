@@ -14,6 +14,7 @@ let currentUTRState = 'none';
 let igvTracks = [];  // Store track references
 let originalResults = null;
 let manePlusSelections = new Map();
+let lastAppliedPadding = null;  // Padding values and the results they produced, to skip no-op requests
 
 // Load settings when the page loads
 fetch('/bed_generator/settings')
@@ -132,40 +133,56 @@ function applyPadding() {
     const snpPadding5 = useSeparateSnpPadding ? (parseInt(document.getElementById('snpPadding5').value) || 0) : padding5;
     const snpPadding3 = useSeparateSnpPadding ? (parseInt(document.getElementById('snpPadding3').value) || 0) : padding3;
     
-    // Get the current state of results (includes UTR changes)
+    // Nothing to do if this padding was just applied and the results have not changed since
     const bedContentElement = document.getElementById('bedContent');
+    const paddingKey = JSON.stringify([padding5, padding3, useSeparateSnpPadding, snpPadding5, snpPadding3]);
+    if (lastAppliedPadding && lastAppliedPadding.key === paddingKey && lastAppliedPadding.content === bedContentElement.value) {
+        return;
+    }
+
+    // Get the current state of results (includes UTR changes)
     const currentResults = JSON.parse(bedContentElement.value);
 
-    fetch('/bed_generator/adjust_padding', {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-            padding_5: padding5,
-            padding_3: padding3,
-            use_separate_snp_padding: useSeparateSnpPadding,
-            snp_padding_5: snpPadding5,
-            snp_padding_3: snpPadding3,
-            include_5utr: document.getElementById('include5UTR').checked,
-            include_3utr: document.getElementById('include3UTR').checked,
-            results: currentResults,  // Use current state instead of original
-            is_padding_update: true   // New flag to indicate this is a padding update
-        }),
-    })
-    .then(response => response.json())
-    .then(data => {
-        if (data.success) {
-            updateTable(data.results);
-            bedContentElement.value = JSON.stringify(data.results);
-            refreshIGV();
-        } else {
-            console.error('Error applying padding:', data.error);
+    // Padding is plain arithmetic on the results already held here, so it is applied locally
+    // rather than sending the whole result list to the server and back
+    currentResults.forEach(result => {
+        // Skip padding for genomic coordinates
+        if (result.is_genomic_coordinate) {
+            return;
+        }
+
+        // Determine if this is a SNP entry and which padding values to use
+        let pad5 = padding5;
+        let pad3 = padding3;
+        if (result.rsid || result.is_snp) {
+            // Skip padding if this is a SNP and separate SNP padding is not enabled
+            if (!useSeparateSnpPadding) {
+                return;
+            }
+            pad5 = snpPadding5;
+            pad3 = snpPadding3;
+        }
+
+        // Store original coordinates (before any padding) if not already stored
+        if (!('original_start' in result)) {
+            result.original_start = result.loc_start;
+            result.original_end = result.loc_end;
+        }
+
+        // Apply padding based on strand direction (default to forward/1 if not specified)
+        if ((result.strand ?? 1) > 0) {  // Forward strand
+            result.loc_start = result.original_start - pad5;
+            result.loc_end = result.original_end + pad3;
+        } else {  // Reverse strand
+            result.loc_start = result.original_start - pad3;
+            result.loc_end = result.original_end + pad5;
         }
-    })
-    .catch(error => {
-        console.error('Error:', error);
     });
+
+    updateTable(currentResults);
+    bedContentElement.value = JSON.stringify(currentResults);
+    lastAppliedPadding = { key: paddingKey, content: bedContentElement.value };
+    refreshIGV();
 }
 
 
@@ -313,12 +330,17 @@ function downloadCustomBed(bedType) {
             addChrPrefix: addChrPrefix
         })
     })
-    .then(response => response.json())
-    .then(data => {
-        if (data.error) {
-            throw new Error(data.error);
+    .then(response => {
+        // The BED file is streamed back as plain text; errors still arrive as JSON
+        if (!response.ok) {
+            return response.json().then(data => {
+                throw new Error(data.error);
+            });
         }
-        downloadFile(data.content, data.filename);
+        const disposition = response.headers.get('Content-Disposition') || '';
+        const match = disposition.match(/filename="?([^"]+)"?/);
+        const downloadName = match ? match[1] : `${filename}_${bedType}.bed`;
+        return response.blob().then(content => downloadFile(content, downloadName));
     })
     .catch(error => {
         console.error('Error:', error);
@@ -1,4 +1,6 @@
 import os
+import logging
+import warnings
 from dotenv import load_dotenv
 
 load_dotenv()  # Load environment variables from .env file
@@ -15,8 +17,17 @@ class Config:
         'sqlite:////' + os.path.join(os.path.abspath(os.path.dirname(__file__)), 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SESSION_TYPE = 'filesystem'
+    # Processed results are kept here, keyed by an id stored in the session
+    RESULTS_CACHE_DIR = os.environ.get('RESULTS_CACHE_DIR') or \
+        os.path.join(os.path.abspath(os.path.dirname(__file__)), 'results_cache')
+    RESULTS_CACHE_TIMEOUT = 3600
     DRAFT_BED_FILES_DIR = os.environ.get('DRAFT_BED_FILES_DIR') or \
         os.path.join(os.path.abspath(os.path.dirname(__file__)), 'draft_bedfiles')
+    # Level for the application log outside debug mode, e.g. WARNING to drop routine INFO messages
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    if not isinstance(logging.getLevelName(LOG_LEVEL), int):
+        warnings.warn(f"Unknown LOG_LEVEL {LOG_LEVEL!r}, falling back to INFO")
+        LOG_LEVEL = 'INFO'
 
 class TestConfig(Config):
     TESTING = True
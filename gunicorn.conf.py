@@ -0,0 +1,18 @@
+"""
+gunicorn.conf.py - Gunicorn settings, picked up automatically when gunicorn is started from this directory.
+
+Worker processes let CPU-bound requests (BED generation on submit) run in parallel, while the
+threads in each worker keep serving I/O-bound requests (TARK/PanelApp lookups) during them.
+Results, sessions and panels are kept on the filesystem or reloaded per process, so nothing
+relies on state shared in memory between workers.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+# Large panels can take a while to look up and submit
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))